@@ -0,0 +1,34 @@
+"""
+Configures the root logger for the package.
+"""
+
+import functools
+import logging
+from datetime import datetime
+from pathlib import Path
+
+# resolved once so per-call path checks don't have to resolve the ".."
+_PKG_ROOT = Path(__file__).resolve().parent.parent
+_LOG_PATH = _PKG_ROOT / "logs"
+
+
+@functools.cache
+def setup_logging() -> Path:
+    """
+    Sets up the logger on first use. Later calls return the cached result.
+
+    :return (Path): The path to the log directory.
+    """
+    # setup the logger
+    _LOG_PATH.mkdir(exist_ok=True)
+
+    # config the logger
+    logging.basicConfig(
+        filename=_LOG_PATH / datetime.now().strftime("%Y-%m-%d.log"),
+        encoding="utf-8",
+        level=logging.DEBUG,    # can change to INFO when moving to production
+        format="%(asctime)s :: %(levelname)-8s :: %(module)s.%(funcName)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    return _LOG_PATH
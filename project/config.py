@@ -4,15 +4,41 @@ and environment variables from either the system or an included .env file.
 """
 
 import logging
+import mmap
 import os
+import pickle
+import tempfile
 from pathlib import Path
+from typing import Optional
 
+import _log
 import utils
 import yaml
-from dotenv import load_dotenv
+
+# prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
 
 logger = logging.getLogger(__name__)
 
+# project files, relative to the package root resolved once in _log
+_CONFIG_PATH = _log._PKG_ROOT / "config.yml"
+_ENV_PATH = _log._PKG_ROOT / ".env"
+
+# (config key, environment variable name) pairs for the required credentials
+ENV_KEYS = (
+    ("email_port", "EMAIL_PORT"),
+    ("email_smtp_server", "EMAIL_SMTP_SERVER"),
+    ("email_sender_email", "EMAIL_SENDER_EMAIL"),
+    ("email_password", "EMAIL_PASSWORD"),
+    ("email_receiver_email", "EMAIL_RECEIVER_EMAIL"),
+)
+
+# backslash escapes decoded inside double-quoted .env values
+ENV_ESCAPES = {"\\": "\\", '"': '"', "'": "'", "n": "\n", "t": "\t"}
+
 
 class Config:
     """
@@ -59,6 +85,69 @@ class Config:
         )
 
 
+def read_config_cache(cache_path: Path, config_stat: os.stat_result) -> Optional[dict]:
+    """
+    Load the pickled config if it was written from the current `config.yml`.
+
+    :param1 cache_path (Path): The path to the cache file.
+    :param2 config_stat (stat_result): The stat of `config.yml`.
+    :return (dict | None): The cached config values, or None if the cache is
+    missing, stale or unreadable.
+    """
+    try:
+        with open(cache_path, "rb") as fh:
+            cache = pickle.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # corrupt pickle data can raise almost anything; the cache is only an
+        # optimisation, so any failure falls back to parsing config.yml
+        logger.warning("Ignoring unreadable config cache %s: %s", cache_path, e)
+        return None
+
+    # the source must match exactly; an older file copied over config.yml
+    # would otherwise pass a newer-than check
+    if (
+        not isinstance(cache, dict)
+        or cache.get("mtime_ns") != config_stat.st_mtime_ns
+        or cache.get("size") != config_stat.st_size
+    ):
+        return None
+
+    return cache.get("config")
+
+
+def write_config_cache(
+    cache_path: Path, config_stat: os.stat_result, config: dict
+) -> None:
+    """
+    Pickle the parsed config next to `config.yml` so later runs can skip parsing,
+    along with the mtime and size of the `config.yml` it was parsed from.
+    The file is written to a temporary path first and then moved into place.
+
+    :param1 cache_path (Path): The path to the cache file.
+    :param2 config_stat (stat_result): The stat of `config.yml` before parsing.
+    :param3 config (dict): The parsed config values.
+    :return: None
+    """
+    cache = {
+        "mtime_ns": config_stat.st_mtime_ns,
+        "size": config_stat.st_size,
+        "config": config,
+    }
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(cache, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning("Could not write config cache %s: %s", cache_path, e)
+
+
 def validate_config(config_path: Path) -> dict:
     """
     Retrieve config settings from `config.yml` and validate them.
@@ -79,8 +168,20 @@ def validate_config(config_path: Path) -> dict:
             "Add a config.yml file to the base directory."
         )
 
-    # load the config.yml file
-    config = yaml.safe_load(open(config_path, encoding="utf-8"))
+    # load the config.yml file, reusing the pickled copy if it is up to date
+    cache_path = config_path.with_suffix(".yml.pkl")
+    config_stat = config_path.stat()
+    config = read_config_cache(cache_path, config_stat)
+    if config is None:
+        # opened in binary so the loader handles decoding itself, and mapped
+        # so it reads one contiguous buffer (an empty file can't be mapped)
+        with open(config_path, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    config = yaml.load(mm, Loader=_Loader)
+            else:
+                config = yaml.load(fh, Loader=_Loader)
+        write_config_cache(cache_path, config_stat, config)
 
     # check each optional configuration option
     # and provide a default if it is empty
@@ -102,6 +203,87 @@ def validate_config(config_path: Path) -> dict:
     return config
 
 
+def read_env() -> dict:
+    """
+    Read the required environment variables from the current environment.
+
+    :return (dict): A dictionary with the values, or None for any that are unset.
+    """
+    return {key: os.environ.get(name) for key, name in ENV_KEYS}
+
+
+def parse_env_value(value: str) -> str:
+    """
+    Parse the value part of a `KEY=VALUE` line from a `.env` file.
+    Quoted values run to the matching closing quote, and double-quoted values
+    have their backslash escapes decoded. Unquoted values end at an inline
+    comment, which starts with whitespace followed by `#`.
+
+    :param1 value (str): The text after the `=`.
+    :return (str): The parsed value.
+    """
+    value = value.strip()
+
+    if value[:1] == '"':
+        # double-quoted values may contain backslash escapes, including \"
+        chars = []
+        index = 1
+        while index < len(value):
+            char = value[index]
+            if char == "\\" and index + 1 < len(value):
+                escaped = value[index + 1]
+                chars.append(ENV_ESCAPES.get(escaped, char + escaped))
+                index += 2
+                continue
+            if char == '"':
+                return "".join(chars)
+            chars.append(char)
+            index += 1
+        # an unmatched quote is kept as part of the value
+        return value
+
+    if value[:1] == "'":
+        end = value.find("'", 1)
+        if end != -1:
+            return value[1:end]
+        # an unmatched quote is kept as part of the value
+        return value
+
+    hash_index = value.find("#", 1)
+    while hash_index != -1:
+        if value[hash_index - 1].isspace():
+            return value[:hash_index].rstrip()
+        hash_index = value.find("#", hash_index + 1)
+
+    return value
+
+
+def read_env_file(env_path: Path, names) -> dict:
+    """
+    Read the given variables from a `.env` file of `KEY=VALUE` lines.
+    Blank lines and `#` comments are skipped, and an `export ` prefix is allowed.
+
+    :param1 env_path (Path): The path to the environment file.
+    :param2 names (Iterable[str]): The environment variable names to read.
+    :return (dict): A dictionary of the names found and their values.
+    """
+    values = {}
+    with open(env_path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith("export "):
+                line = line[len("export "):].lstrip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+
+            name, _, value = line.partition("=")
+            name = name.strip()
+            if name in names:
+                values[name] = parse_env_value(value)
+
+    return values
+
+
 def validate_env(env_path: Path) -> dict:
     """
     Retrieve environment variables trying the system first, then a `.env` file.
@@ -111,22 +293,10 @@ def validate_env(env_path: Path) -> dict:
     :return (dict): A dictionary with values from the environment file.
     """
 
-    env = {
-        "email_port": None,
-        "email_smtp_server": None,
-        "email_sender_email": None,
-        "email_password": None,
-        "email_receiver_email": None,
-    }
-
-    env["email_port"] = os.environ.get("EMAIL_PORT")
-    env["email_smtp_server"] = os.environ.get("EMAIL_SMTP_SERVER")
-    env["email_sender_email"] = os.environ.get("EMAIL_SENDER_EMAIL")
-    env["email_password"] = os.environ.get("EMAIL_PASSWORD")
-    env["email_receiver_email"] = os.environ.get("EMAIL_RECEIVER_EMAIL")
+    env = read_env()
 
     # if no system environment variables, check file
-    if None in env.values():
+    if any(value is None for value in env.values()):
         logger.info("No system environment variables found. Trying .env file...")
 
         if not env_path.is_file():
@@ -140,15 +310,14 @@ def validate_env(env_path: Path) -> dict:
                 "Add system environment variables or a .env file to the resources directory."
             )
 
-        load_dotenv(env_path)
-
-        env["email_port"] = os.environ.get("EMAIL_PORT")
-        env["email_smtp_server"] = os.environ.get("EMAIL_SMTP_SERVER")
-        env["email_sender_email"] = os.environ.get("EMAIL_SENDER_EMAIL")
-        env["email_password"] = os.environ.get("EMAIL_PASSWORD")
-        env["email_receiver_email"] = os.environ.get("EMAIL_RECEIVER_EMAIL")
+        # fill in only the variables the system didn't provide, and export
+        # them like load_dotenv would, without overriding existing ones
+        missing = {name: key for key, name in ENV_KEYS if env[key] is None}
+        for name, value in read_env_file(env_path, missing).items():
+            env[missing[name]] = value
+            os.environ.setdefault(name, value)
 
-        if None in env.values():
+        if any(value is None for value in env.values()):
             logger.error(
                 "Some or all .env file variables are empty. "
                 "Update %s to include all necessary environment variables.",
@@ -175,15 +344,13 @@ def get_config() -> Config:
     """
 
     # config the logger
-    utils.logger_setup()
+    log_path = _log.setup_logging()
 
-    config_path = Path(__file__).parent / "../config.yml"
-    config = validate_config(config_path)
+    config = validate_config(_CONFIG_PATH)
 
     # in production, can use system environment variables instead
     # assumes the .env file is required. If not, this can be removed
-    env_path = Path(__file__).parent / "../.env"
-    env = validate_env(env_path)
+    env = validate_env(_ENV_PATH)
 
     config = Config(
         enable_email_notifications=config.get("enable_email_notifications"),
@@ -196,7 +363,6 @@ def get_config() -> Config:
     )
 
     # clean old logs
-    log_path = Path(logger.root.handlers[0].baseFilename).parent
     utils.clean_old_logs(log_path, config.log_retention_period)
 
     return config
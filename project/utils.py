@@ -2,34 +2,59 @@
 Provides utility functions to the rest of the modules in the package.
 """
 
+import atexit
 import logging
+import os
 import platform
 import smtplib
 import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import _log
 import config
 
 logger = logging.getLogger(__name__)
 
-
-def logger_setup() -> None:
-    """
-    Sets up the logger.
-    """
-    # setup the logger
-    log_path = Path(__file__).parent / "../logs/"
-    log_path.mkdir(parents=True, exist_ok=True)
-
-    # config the logger
-    logging.basicConfig(
-        filename=log_path / datetime.now().strftime("%Y-%m-%d.log"),
-        encoding="utf-8",
-        level=logging.DEBUG,    # can change to INFO when moving to production
-        format="%(asctime)s :: %(levelname)-8s :: %(module)s.%(funcName)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+# host details used in email notifications, which don't change while running
+_HOST = platform.node()
+_OS = f"{platform.system()} {platform.release()}"
+_PYTHON_VERSION = platform.python_version()
+_CWD = Path.cwd()
+
+# layout of the notification email; the host fields are filled from
+# _MESSAGE_FIELDS and the rest per message
+_MESSAGE_TEMPLATE = (
+    "Subject: {name} - {exit_status}"
+    "     Exit Status: {exit_status}\n"
+    "Application Name: {name}\n"
+    "       Timestamp: {timestamp}\n"
+    "            Host: {host}\n"
+    "       Directory: {directory}\n"
+    "    Last Run Log: {log_file}\n"
+    "Operating System: {os}\n"
+    "  Python Version: {python_version}\n\n"
+    "{message}"
+)
+_MESSAGE_FIELDS = {
+    "name": _CWD.stem,
+    "host": _HOST,
+    "directory": _CWD,
+    "os": _OS,
+    "python_version": _PYTHON_VERSION,
+}
+
+# SMTP connection shared between send_email calls, opened on first use,
+# and the (server, port, sender) it was opened and logged in with
+_SMTP = None
+_SMTP_KEY = None
+
+# seconds to wait on any SMTP operation; the connection is kept open, so
+# without this a half-open socket could block noop() for minutes
+SMTP_TIMEOUT = 30
+_SMTP_LOCK = threading.Lock()
 
 
 def clean_old_logs(log_dir: Path, days: int = 30) -> None:
@@ -40,63 +65,178 @@ def clean_old_logs(log_dir: Path, days: int = 30) -> None:
     :param2 days (int): The number of days to keep logs for.
     :return: None
     """
-    cutoff_date = datetime.now() - timedelta(days=days)
-    for log_file in log_dir.glob("*.log"):
-        file_date = datetime.strptime(log_file.stem, "%Y-%m-%d")
-        if file_date < cutoff_date:
-            log_file.unlink()
-            logger.info("Deleted old log file: %s", log_file)
+    # log files are named YYYY-MM-DD.log, so comparing the names as strings
+    # orders them the same as comparing their dates
+    cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    old_logs = []
+    with os.scandir(log_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if (
+                len(name) != 14
+                or not name.endswith(".log")
+                or not name[:4].isdigit()
+                or name[4] != "-"
+                or not name[5:7].isdigit()
+                or name[7] != "-"
+                or not name[8:10].isdigit()
+            ):
+                continue
+
+            if name[:10] < cutoff_date:
+                old_logs.append(entry.path)
+
+    if not old_logs:
+        return
 
+    # unlink releases the GIL, so a few threads overlap the syscalls
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(os.unlink, old_logs))
 
-def send_email(c_config, message: str, exit_status: str = 'SUCCESS') -> None:
+    logger.info("Deleted %d old log files from: %s", len(old_logs), log_dir)
+
+
+def get_smtp_connection(c_config) -> smtplib.SMTP_SSL:
     """
-    Sends an email upon program completion with a success
-    or error message.
+    Returns the shared SMTP connection, opening and logging in if there is none
+    yet, the server has dropped the existing one, or it was opened for a different
+    server, port or sender. Callers must hold `_SMTP_LOCK`.
 
     :param1 c_config (Config): The config which contains email
     credential info pulled from the system environment variables or .env file.
-    :param2 message (str): The success or error message to send.
-    :param3 exit_status (str): The exit status of the application.
+    :return (SMTP_SSL): A logged in SMTP connection.
     """
+    global _SMTP, _SMTP_KEY
+
+    key = (c_config.email_smtp_server, c_config.email_port, c_config.email_sender_email)
+    if _SMTP is not None and _SMTP_KEY != key:
+        close_smtp_connection()
+
+    if _SMTP is not None:
+        try:
+            if _SMTP.noop()[0] == 250:
+                return _SMTP
+        except (smtplib.SMTPException, OSError):
+            pass
+        close_smtp_connection()
+
+    context = ssl.create_default_context()
+    server = smtplib.SMTP_SSL(
+        c_config.email_smtp_server,
+        c_config.email_port,
+        timeout=SMTP_TIMEOUT,
+        context=context,
+    )
+    try:
+        server.login(c_config.email_sender_email, c_config.email_password)
+    except BaseException:
+        server.close()
+        raise
 
-    if not c_config.enable_email_notifications:
-        logger.info("Email notifications are disabled. Update 'config.yml' to enable.")
+    _SMTP = server
+    _SMTP_KEY = key
+    return _SMTP
+
+
+def close_smtp_connection() -> None:
+    """
+    Closes the shared SMTP connection if one is open.
+
+    :return: None
+    """
+    global _SMTP, _SMTP_KEY
+
+    if _SMTP is None:
         return
 
-    cwd = Path.cwd()
+    try:
+        _SMTP.quit()
+    except (smtplib.SMTPException, OSError):
+        _SMTP.close()
+    _SMTP = None
+    _SMTP_KEY = None
 
-    # if message is an error, exit_status = 'Error'
 
-    message = (
-        f"Subject: {cwd.stem} - {exit_status}"
-        f"     Exit Status: {exit_status}\n"
-        f"Application Name: {cwd.stem}\n"
-        f"       Timestamp: {datetime.now()}\n"
-        f"            Host: {platform.node()}\n"
-        f"       Directory: {cwd}\n"
-        f"    Last Run Log: {logger.root.handlers[0].baseFilename}\n"
-        f"Operating System: {platform.system()} {platform.release()}\n"
-        f"  Python Version: {platform.python_version()}\n\n"
-        f"{message}"
-    )
+atexit.register(close_smtp_connection)
+
+# sends emails in the background. concurrent.futures joins its workers at
+# interpreter exit before any atexit handler runs, so queued emails are sent
+# before close_smtp_connection closes the connection
+_MAIL_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mail")
+
+
+def deliver_email(c_config, message: str, raise_unexpected: bool = False) -> None:
+    """
+    Sends a fully formatted email over the shared SMTP connection.
+    SMTP and connection errors are logged. Other errors are logged with a
+    traceback, and re-raised only when `raise_unexpected` is set.
+
+    :param1 c_config (Config): The config which contains email
+    credential info pulled from the system environment variables or .env file.
+    :param2 message (str): The complete email, including the subject line.
+    :param3 raise_unexpected (bool): Whether to re-raise unexpected errors.
+    :return: None
+    """
 
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(
-            c_config.email_smtp_server, c_config.email_port, context=context
-        ) as server:
-            server.login(c_config.email_sender_email, c_config.email_password)
+        with _SMTP_LOCK:
+            server = get_smtp_connection(c_config)
             server.sendmail(
                 c_config.email_sender_email,
                 c_config.email_receiver_email,
                 message
             )
-    except Exception as e:
+    except (smtplib.SMTPException, OSError) as e:
+        # expected failures: network, TLS (ssl.SSLError is an OSError), auth
         logger.error("Failed sending email: %s", e)
+        return
+    except Exception:
+        logger.exception("Unexpected error sending email.")
+        # on the mail thread a raised exception would only end up in a Future
+        # nobody reads, so it is only re-raised for synchronous callers
+        if raise_unexpected:
+            raise
+        return
 
     logger.info("Email notification sent to: %s", c_config.email_receiver_email)
 
 
+def send_email(c_config, message: str, exit_status: str = 'SUCCESS') -> None:
+    """
+    Sends an email upon program completion with a success
+    or error message. The email is sent from a background thread.
+
+    :param1 c_config (Config): The config which contains email
+    credential info pulled from the system environment variables or .env file.
+    :param2 message (str): The success or error message to send.
+    :param3 exit_status (str): The exit status of the application.
+    """
+
+    _log.setup_logging()
+
+    if not c_config.enable_email_notifications:
+        logger.info("Email notifications are disabled. Update 'config.yml' to enable.")
+        return
+
+    # if message is an error, exit_status = 'Error'
+
+    message = _MESSAGE_TEMPLATE.format(
+        **_MESSAGE_FIELDS,
+        exit_status=exit_status,
+        timestamp=datetime.now(),
+        log_file=logger.root.handlers[0].baseFilename,
+        message=message,
+    )
+
+    # hand off to the mail thread so the caller isn't blocked on SMTP. Once
+    # the interpreter is shutting down (e.g. when called from an atexit
+    # handler) the pool no longer accepts work, so send it directly
+    try:
+        _MAIL_POOL.submit(deliver_email, c_config, message)
+    except RuntimeError:
+        deliver_email(c_config, message, raise_unexpected=True)
+
+
 if __name__ == "__main__":
     user_config = config.get_config()
     print("\n-----utils.py-----\n")
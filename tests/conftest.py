@@ -0,0 +1,9 @@
+"""
+Shared pytest setup. The project modules import each other by bare name
+(`import config`), so the package directory is put on the import path.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "project"))
@@ -0,0 +1,172 @@
+"""
+Tests for the config module.
+"""
+
+import os
+import pickle
+
+import config
+import pytest
+
+
+def write_config(path, retention):
+    """
+    Writes a minimal config.yml with the given log retention period.
+    """
+    path.write_text(
+        f"enable_email_notifications: false\nlog_retention_period: {retention}\n",
+        encoding="utf-8",
+    )
+
+
+def test_validate_config_writes_and_reuses_cache(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.yml"
+    write_config(config_path, 30)
+
+    assert config.validate_config(config_path)["log_retention_period"] == 30
+    assert (tmp_path / "config.yml.pkl").is_file()
+
+    # a cache hit must not parse the YAML again
+    def fail_load(*args, **kwargs):
+        raise AssertionError("config.yml was parsed despite a valid cache")
+
+    monkeypatch.setattr(config.yaml, "load", fail_load)
+    assert config.validate_config(config_path)["log_retention_period"] == 30
+
+
+def test_validate_config_ignores_cache_from_older_file(tmp_path):
+    config_path = tmp_path / "config.yml"
+    write_config(config_path, 30)
+    stat = config_path.stat()
+    config.validate_config(config_path)
+
+    # replace config.yml with a file whose mtime is older than the cache,
+    # as `cp -p` from a backup would
+    write_config(config_path, 7)
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    assert config.validate_config(config_path)["log_retention_period"] == 7
+
+
+def test_validate_config_recovers_from_corrupt_cache(tmp_path):
+    config_path = tmp_path / "config.yml"
+    cache_path = tmp_path / "config.yml.pkl"
+    write_config(config_path, 14)
+    config.validate_config(config_path)
+
+    cache_path.write_bytes(cache_path.read_bytes()[:10])
+
+    assert config.validate_config(config_path)["log_retention_period"] == 14
+    with open(cache_path, "rb") as fh:
+        assert pickle.load(fh)["config"]["log_retention_period"] == 14
+
+
+def test_read_env_file_parses_common_syntax(tmp_path):
+    env_path = tmp_path / ".env"
+    env_path.write_text(
+        "# comment line\n"
+        "\n"
+        "PLAIN=value\n"
+        "COMMENTED=abc # my comment\n"
+        "HASH_IN_VALUE=abc#def\n"
+        "DOUBLE=\"quoted # not a comment\"\n"
+        "SINGLE='single quoted' # comment\n"
+        "ESCAPED_QUOTE=\"ab\\\"cd\"\n"
+        "ESCAPED_BACKSLASH=\"a\\\\b\"\n"
+        "ESCAPES=\"it\\'s\\n\\tx\"\n"
+        "UNKNOWN_ESCAPE=\"a\\qb\"\n"
+        "SINGLE_NO_ESCAPES='a\\nb'\n"
+        "UNMATCHED=pa'\n"
+        "UNMATCHED_OPEN='pa\n"
+        "export EXPORTED=exported value\n"
+        "EQUALS=a=b\n"
+        "EMPTY=\n"
+        "IGNORED=not requested\n",
+        encoding="utf-8",
+    )
+    names = {
+        "PLAIN",
+        "COMMENTED",
+        "HASH_IN_VALUE",
+        "DOUBLE",
+        "SINGLE",
+        "ESCAPED_QUOTE",
+        "ESCAPED_BACKSLASH",
+        "ESCAPES",
+        "UNKNOWN_ESCAPE",
+        "SINGLE_NO_ESCAPES",
+        "UNMATCHED",
+        "UNMATCHED_OPEN",
+        "EXPORTED",
+        "EQUALS",
+        "EMPTY",
+        "MISSING",
+    }
+
+    assert config.read_env_file(env_path, names) == {
+        "PLAIN": "value",
+        "COMMENTED": "abc",
+        "HASH_IN_VALUE": "abc#def",
+        "DOUBLE": "quoted # not a comment",
+        "SINGLE": "single quoted",
+        "ESCAPED_QUOTE": 'ab"cd',
+        "ESCAPED_BACKSLASH": "a\\b",
+        "ESCAPES": "it's\n\tx",
+        "UNKNOWN_ESCAPE": "a\\qb",
+        "SINGLE_NO_ESCAPES": "a\\nb",
+        "UNMATCHED": "pa'",
+        "UNMATCHED_OPEN": "'pa",
+        "EXPORTED": "exported value",
+        "EQUALS": "a=b",
+        "EMPTY": "",
+    }
+
+
+def test_validate_env_fills_missing_values_from_file(tmp_path, monkeypatch):
+    # setenv first so monkeypatch restores the original state afterwards,
+    # including removing the variables exported from the file
+    for _, name in config.ENV_KEYS:
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+    monkeypatch.setenv("EMAIL_PORT", "587")
+
+    env_path = tmp_path / ".env"
+    env_path.write_text(
+        "EMAIL_PORT=465\n"
+        "export EMAIL_SMTP_SERVER=smtp.example.com\n"
+        "EMAIL_SENDER_EMAIL=\"a@example.com\"\n"
+        "EMAIL_PASSWORD=abc # my comment\n"
+        "EMAIL_RECEIVER_EMAIL=b@example.com\n",
+        encoding="utf-8",
+    )
+
+    env = config.validate_env(env_path)
+
+    assert env == {
+        "email_port": "587",
+        "email_smtp_server": "smtp.example.com",
+        "email_sender_email": "a@example.com",
+        "email_password": "abc",
+        "email_receiver_email": "b@example.com",
+    }
+    # values from the file are exported without overriding the system
+    assert os.environ["EMAIL_PORT"] == "587"
+    assert os.environ["EMAIL_PASSWORD"] == "abc"
+
+
+def test_validate_config_recovers_from_corrupt_cache_body(tmp_path):
+    config_path = tmp_path / "config.yml"
+    cache_path = tmp_path / "config.yml.pkl"
+    write_config(config_path, 14)
+    config.validate_config(config_path)
+
+    # a well-formed pickle frame holding a string that isn't valid UTF-8;
+    # corrupt bodies raise more than just UnpicklingError
+    cache_path.write_bytes(b"\x80\x04\x8c\x02\xff\xfe.")
+    with pytest.raises(UnicodeDecodeError):
+        with open(cache_path, "rb") as fh:
+            pickle.load(fh)
+
+    assert config.validate_config(config_path)["log_retention_period"] == 14
+    with open(cache_path, "rb") as fh:
+        assert pickle.load(fh)["config"]["log_retention_period"] == 14
@@ -0,0 +1,179 @@
+"""
+Tests for the utils module.
+"""
+
+import logging
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import pytest
+import utils
+
+
+def test_clean_old_logs_only_deletes_dated_logs(tmp_path):
+    for name in ("2000-01-01.log", "2999-01-01.log", "2020-ab-cd.log", "notes.log"):
+        (tmp_path / name).touch()
+
+    utils.clean_old_logs(tmp_path, days=30)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "2020-ab-cd.log",
+        "2999-01-01.log",
+        "notes.log",
+    ]
+
+
+class FakeSMTP:
+    """
+    Stands in for `smtplib.SMTP_SSL` and records the connections made.
+    """
+
+    instances = []
+
+    def __init__(self, host, port, timeout=None, context=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.noop_code = 250
+        self.logins = []
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def login(self, user, password):
+        self.logins.append(user)
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        self.sent.append((from_addr, to_addrs, msg))
+
+    def noop(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected()
+        return (self.noop_code, b"OK")
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def make_config(server="smtp.example.com", port=465, sender="a@example.com"):
+    """
+    Builds a Config with the given email settings.
+    """
+    return config.Config(
+        enable_email_notifications=True,
+        log_retention_period=30,
+        email_port=port,
+        email_smtp_server=server,
+        email_sender_email=sender,
+        email_password="password",
+        email_receiver_email="b@example.com",
+    )
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    """
+    Replaces SMTP_SSL with FakeSMTP and resets the shared connection.
+    """
+    FakeSMTP.instances = []
+    monkeypatch.setattr(utils.smtplib, "SMTP_SSL", FakeSMTP)
+    utils.close_smtp_connection()
+    yield FakeSMTP
+    utils.close_smtp_connection()
+
+
+def test_get_smtp_connection_reuses_connection(fake_smtp):
+    c_config = make_config()
+
+    first = utils.get_smtp_connection(c_config)
+    second = utils.get_smtp_connection(c_config)
+
+    assert first is second
+    assert len(fake_smtp.instances) == 1
+    assert first.timeout == utils.SMTP_TIMEOUT
+    assert first.logins == ["a@example.com"]
+
+
+def test_get_smtp_connection_reconnects_when_dropped(fake_smtp):
+    c_config = make_config()
+
+    first = utils.get_smtp_connection(c_config)
+    first.noop_code = 421
+    second = utils.get_smtp_connection(c_config)
+
+    assert second is not first
+    assert first.closed
+    assert len(fake_smtp.instances) == 2
+
+
+def test_get_smtp_connection_reconnects_for_different_settings(fake_smtp):
+    first = utils.get_smtp_connection(make_config())
+    second = utils.get_smtp_connection(make_config(sender="c@example.com"))
+    third = utils.get_smtp_connection(make_config(server="smtp.other.com"))
+
+    assert first.closed and second.closed
+    assert second.logins == ["c@example.com"]
+    assert third.host == "smtp.other.com"
+    assert len(fake_smtp.instances) == 3
+
+
+def test_send_email_sends_directly_after_pool_shutdown(fake_smtp, monkeypatch, tmp_path):
+    # send_email reads the log file name off the root handler
+    handler = logging.FileHandler(tmp_path / "test.log")
+    monkeypatch.setattr(utils._log, "setup_logging", lambda: None)
+    monkeypatch.setattr(logging.root, "handlers", [handler])
+
+    # as during interpreter shutdown, when atexit handlers run
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+    monkeypatch.setattr(utils, "_MAIL_POOL", pool)
+
+    try:
+        utils.send_email(make_config(), "done")
+    finally:
+        handler.close()
+
+    sent = fake_smtp.instances[0].sent
+    assert len(sent) == 1
+    assert sent[0][:2] == ("a@example.com", "b@example.com")
+
+
+def test_deliver_email_logs_unexpected_errors(fake_smtp, monkeypatch, caplog):
+    def bad_login(self, user, password):
+        raise ValueError("bad login")
+
+    monkeypatch.setattr(FakeSMTP, "login", bad_login)
+
+    with caplog.at_level(logging.INFO, logger=utils.logger.name):
+        utils.deliver_email(make_config(), "message")
+
+    errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert errors[0].exc_info[0] is ValueError
+    assert "Email notification sent" not in caplog.text
+
+
+def test_send_email_reraises_unexpected_errors_when_synchronous(
+    fake_smtp, monkeypatch, tmp_path
+):
+    def bad_login(self, user, password):
+        raise ValueError("bad login")
+
+    handler = logging.FileHandler(tmp_path / "test.log")
+    monkeypatch.setattr(FakeSMTP, "login", bad_login)
+    monkeypatch.setattr(utils._log, "setup_logging", lambda: None)
+    monkeypatch.setattr(logging.root, "handlers", [handler])
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+    monkeypatch.setattr(utils, "_MAIL_POOL", pool)
+
+    try:
+        with pytest.raises(ValueError):
+            utils.send_email(make_config(), "done")
+    finally:
+        handler.close()